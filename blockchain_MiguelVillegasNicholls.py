@@ -4,6 +4,8 @@ import time
 import os
 import subprocess
 import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 # Código con las adiciones para el parcial 2
 
@@ -274,6 +276,47 @@ def hacerMenu ():
         return None
 
 
+# ========== MINADO EN PARALELO ==========
+
+CEROS_MINADO_PARALELO = 20 # Desde esta dificultad se reparte el minado entre los núcleos (con menos, arrancar procesos tarda más que minar)
+INTENTOS_POR_REVISION = 4096 # Cada cuántos nonces revisa un proceso si otro ya encontró el hash
+
+eventoParada = None # Evento compartido entre procesos para avisar que ya se encontró un hash válido
+
+# Se ejecuta al arrancar cada proceso para que conozca el evento de parada
+def iniciarProcesoMinero(evento):
+    global eventoParada
+    eventoParada = evento
+
+
+# Cada proceso prueba los nonces inicio, inicio + paso, inicio + 2*paso... así ningún par de procesos repite un nonce
+def minarRango(bloque, inicio: int, paso: int):
+    copiarBase = hashlib.sha256(bloque.construirPrefijo()).copy # El prefijo se procesa una sola vez, igual que en Bloque.minar
+    objetivo = bloque.calcularObjetivo()
+    nonce = inicio
+    while not eventoParada.is_set(): # Si otro proceso ya encontró un hash válido, este se detiene
+        for _ in range(INTENTOS_POR_REVISION):
+            h = copiarBase()
+            h.update(b"%d" % nonce)
+            hash = h.digest()
+            if hash < objetivo:
+                eventoParada.set() # Se avisa a los demás procesos que paren
+                return nonce, hash
+            nonce += paso
+    return None # Otro proceso lo encontró primero
+
+
+# Lanza un proceso por núcleo con su propio rango de nonces y devuelve (nonce, hash) con el menor nonce encontrado
+def minarEnParalelo(bloque, procesos: int):
+    evento = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=procesos, initializer=iniciarProcesoMinero, initargs=(evento,)) as pool:
+        tareas = [pool.submit(minarRango, bloque, i, procesos) for i in range(procesos)]
+        resultados = [tarea.result() for tarea in tareas]
+    return min(resultado for resultado in resultados if resultado is not None)
+
+# ========== FIN MINADO EN PARALELO ==========
+
+
 # Clase Bloque que contiene funciones muy importantes
 class Bloque:
     def __init__ (self, hashPrevio: bytes, ceros: int):
@@ -282,15 +325,20 @@ class Bloque:
         self.ceros = ceros # Número de ceros objetivo que se busca en el hash
         self.nonce = 0 # Nonce con el que se inicia en el bloque
         self.hash = None # Hash del bloque actual
-        self.inicio = 0.0 # Inicio del minado 
+        self.inicio = 0.0 # Inicio del minado (reloj time.perf_counter, solo sirve para medir duraciones)
         self.final  = 0.0 # Final del minado
         self.segundos = 0.0 # Tiempo en segundos que se demora el minado
 
 
+    # Función para obtener la parte del contenido que no depende del nonce (hash previo y timestamp)
+    def construirPrefijo (self) -> bytes:
+        return self.hashPrevio + str(self.tiempo.timestamp()).encode('utf-8') # Objeto de Bytes donde se concatena el hash y el timestamp
+
+
     # Función para "unir" o concatenar toda la info que irá dentro del bloque para calcular el hash    
     def construirContenido (self, nonce:int) -> bytes:
         partes = (
-            self.hashPrevio + str(self.tiempo.timestamp()).encode('utf-8') + str(nonce).encode('utf-8') # Objeto de Bytes donde se concatena el hash, timestamp y nonce
+            self.construirPrefijo() + str(nonce).encode('utf-8') # Objeto de Bytes donde se concatena el prefijo (hash y timestamp) y el nonce
         )
         return partes
     
@@ -336,18 +384,40 @@ class Bloque:
         return True # Si no hemos retornado False hasta el momento, entonces el hash es válido
     
 
+    # Función para obtener el límite que debe cumplir el hash: tener self.ceros bits en cero al inicio
+    # equivale a que, visto como número de 256 bits, sea menor que 2^(256 - ceros)
+    def calcularObjetivo (self) -> bytes:
+        if self.ceros == 0:
+            return b'\xff' * 33 # Cualquier hash de 32 bytes es menor que esto (sin ceros, todo hash sirve)
+        return (1 << (256 - self.ceros)).to_bytes(32, 'big') # Comparar bytes de igual largo es igual a comparar los números
+
+
     # Función para coger un bloque y minarlo para calcular el hash y ver si es válido y ya entonces determinar la info. del bloque
     def minar (self):
-        self.inicio = time.time() # Se determina el tiempo en el que inicia la minería
+        self.inicio = time.perf_counter() # Se determina el tiempo en el que inicia la minería
+
+        # Con dificultad alta y varios núcleos, cada núcleo busca en su propio rango de nonces
+        procesos = os.cpu_count() or 1
+        if self.ceros >= CEROS_MINADO_PARALELO and procesos > 1:
+            self.nonce, self.hash = minarEnParalelo(self, procesos)
+            self.final = time.perf_counter()
+            self.segundos = self.final - self.inicio
+            return
+
         nonce = 0 # Nonce = 0 para empezar
+        base = hashlib.sha256(self.construirPrefijo()) # El prefijo no cambia mientras se mina: se procesa una sola vez
+        copiarBase = base.copy # Se guarda el método en una variable local para no buscarlo en cada intento
+        objetivo = self.calcularObjetivo() # Da el mismo resultado que hashValido pero con una sola comparación de bytes
 
         # Hasta que el hash del bloque sea válido
         while True:
-            hash = self.calcularHash(nonce) # Se calcula el hash con el nonce actual y se asigna a la variable
-            if self.hashValido(hash): # Si el hash calculado con el nonce actual es válido
+            h = copiarBase() # Se copia el estado del sha256 que ya tiene el prefijo (mucho más barato que reconstruir todo)
+            h.update(b"%d" % nonce) # Solo se le agrega el nonce actual, con el mismo formato que str(nonce)
+            hash = h.digest() # Es el mismo hash que daría calcularHash(nonce)
+            if hash < objetivo: # Si el hash calculado con el nonce actual es válido
                 self.nonce = nonce # Se asigna el nonce usado para encontrar el hash válido al bloque
                 self.hash = hash # Se asigna el hash válido encontrado al bloque
-                self.final = time.time() # Se calcula el tiempo del final del minado
+                self.final = time.perf_counter() # Se calcula el tiempo del final del minado
                 self.segundos = self.final - self.inicio # Se resta final - inicio para encontrar el tiempo en segundos
                 return # Se termina
             nonce += 1 # Si el hash no es válido entonces se sumenta el nonce en 1
@@ -4,20 +4,52 @@ Sistema de Consenso Distribuido para Blockchain
 ===================================================================
 """
 
+import asyncio
+import atexit
+import bisect
 import datetime
+import functools
 import hashlib
+import heapq
+import hmac
+import itertools
+import math
 import time
-import json
 import random
+import secrets
+import shutil
+import socket
 import struct
 import subprocess
+import sys
 import os
+from collections import Counter
 from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
+import orjson
 import uvicorn
 import threading
+import multiprocessing
+
+
+STATE_FILE = 'consensus_protocol_state.json'
+WAL_FILE = 'consensus_protocol_state.wal'  # Registro de cambios (JSONL) aplicado sobre STATE_FILE
+WAL_COMPACT_BYTES = 1 << 20  # Tamaño del registro a partir del cual se reescribe la instantánea
+STATE_FLUSH_INTERVAL = 0.1  # Segundos para agrupar escrituras de estado
+WAL_FLUSH_BYTES = 64 * 1024  # Eventos en memoria que adelantan la escritura sin esperar el intervalo
+PARALLEL_MINING_DIFFICULTY = 6  # Por debajo, arrancar procesos cuesta más que minar en serie
+MINING_CHECK_INTERVAL = 4096  # Intentos entre consultas del evento de parada
+MAX_PENDING_TRANSACTIONS = 10_000  # Transacciones en espera; al llenarse se rechazan las nuevas
+
+_FIELD_LENGTH = struct.Struct('>I')  # Prefijo de longitud para campos de mensajes firmados
+_FREEZE_FIELDS = struct.Struct('>qq')  # tokens, marca de tiempo
+_TX_FIELDS = struct.Struct('>dd')  # monto, marca de tiempo de una transacción
+_NONCE_BLOCK = 1000  # Nonces que comparten dígitos altos durante el minado
+_NONCE_SUFFIXES = tuple(b"%03d" % i for i in range(_NONCE_BLOCK))  # Últimos dígitos con ceros
+_SHORT_NONCE_SUFFIXES = tuple(b"%d" % i for i in range(_NONCE_BLOCK))  # Nonces menores que el bloque
 
 
 # MODELOS DEL PROTOCOLO (Cumplimiento Exacto de Especificación)
@@ -60,6 +92,14 @@ class FraudReportReq(BaseModel):
 
 # PROVEEDOR CRIPTOGRÁFICO (GPG + Respaldo Simulado)
 
+def _mock_signature(key_id: str, data: bytes) -> str:
+    """Firma simulada determinista para el par (clave, datos)."""
+    # BLAKE2b con clave (MAC) ligado a los datos; en simulación la clave pública actúa como clave compartida
+    key = key_id.encode()
+    if len(key) > 64:
+        key = hashlib.blake2b(key).digest()  # BLAKE2b admite claves de hasta 64 bytes
+    return f"mock_signature_{hashlib.blake2b(data, key=key, digest_size=8).hexdigest()}"
+
 class CryptographicProvider:
     """Operaciones criptográficas con implementación real GPG y respaldo simulado."""
     
@@ -68,11 +108,8 @@ class CryptographicProvider:
         self.mock_keys = {}  # For simulation when GPG unavailable
     
     def _check_gpg_availability(self) -> bool:
-        try:
-            result = subprocess.run(['gpg', '--version'], capture_output=True, text=True)
-            return result.returncode == 0
-        except:
-            return False
+        # Buscar el ejecutable en PATH sin lanzar un subproceso
+        return shutil.which('gpg') is not None
     
     def sign_with_private_key(self, private_key_id: str, data: bytes) -> str:
         """Firmar datos con clave privada (GPG o simulado)."""
@@ -88,6 +125,12 @@ class CryptographicProvider:
         else:
             return self._mock_verify(public_key, data, signature)
     
+    def verify_signatures_bulk(self, items: List[Tuple[str, bytes, str]]) -> List[bool]:
+        """Verificar varias firmas (public_key, data, signature) en un solo llamado."""
+        # _gpg_verify aún no lanza gpg y la verificación simulada es CPU pura: en serie se evita el
+        # costo de repartir entre hilos (~50 veces más lento para pocos elementos)
+        return [self.verify_signature(*item) for item in items]
+    
     def encrypt_with_private_key(self, private_key_id: str, data: int) -> str:
         """Cifrar número de 32-bit con clave privada."""
         data_bytes = struct.pack('>I', data)  # 32-bit big-endian
@@ -107,9 +150,12 @@ class CryptographicProvider:
     
     def _gpg_sign(self, key_id: str, data: bytes) -> str:
         try:
-            cmd = f'echo "{data.hex()}" | gpg --armor --detach-sign --local-user {key_id}'
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-            return result.stdout if result.returncode == 0 else f"mock_sig_{key_id}"
+            # Datos por stdin y argumentos como lista: sin shell ni interpolación de key_id
+            result = subprocess.run(
+                ['gpg', '--batch', '--armor', '--detach-sign', '--local-user', key_id],
+                input=data, capture_output=True
+            )
+            return result.stdout.decode() if result.returncode == 0 else f"mock_sig_{key_id}"
         except:
             return f"mock_sig_{key_id}"
     
@@ -129,14 +175,16 @@ class CryptographicProvider:
         return bytes.fromhex(encrypted.split('_')[1]) if '_' in encrypted else b'\x00\x00\x00\x01'
     
     def _mock_sign(self, key_id: str, data: bytes) -> str:
-        hash_obj = hashlib.sha256(data + key_id.encode())
-        return f"mock_signature_{hash_obj.hexdigest()[:16]}"
+        return _mock_signature(key_id, data)
     
     def _mock_verify(self, public_key: str, data: bytes, signature: str) -> bool:
-        return signature.startswith("mock_signature_")
+        # compare_digest rechaza str con caracteres no ASCII: se comparan bytes. "surrogatepass" codifica
+        # también surrogates sueltos (JSON "\ud800"), que así solo hacen fallar la comparación
+        return hmac.compare_digest(signature.encode('utf-8', 'surrogatepass'),
+                                   self._mock_sign(public_key, data).encode())
     
     def _mock_encrypt(self, key_id: str, data: bytes) -> str:
-        return f"mock_encrypted_{data.hex()}_{hashlib.md5(key_id.encode()).hexdigest()[:8]}"
+        return f"mock_encrypted_{data.hex()}_{hashlib.blake2b(key_id.encode(), digest_size=4).hexdigest()}"
     
     def _mock_decrypt(self, public_key: str, encrypted: str) -> bytes:
         try:
@@ -148,7 +196,23 @@ class CryptographicProvider:
 
 # MOTOR DE PROTOCOLO DE CONSENSO (Especificación Exacta)
 
-@dataclass
+def _synchronized(method):
+    """Serializar el acceso al estado compartido entre el hilo de la API y la demostración."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _signed_message(*fields: bytes) -> bytes:
+    """Concatenar campos con prefijo de longitud para que "ab"+"c" y "a"+"bc" firmen mensajes distintos."""
+    parts = []
+    for part in fields:
+        parts.append(_FIELD_LENGTH.pack(len(part)))
+        parts.append(part)
+    return b''.join(parts)
+
+@dataclass(slots=True)  # Sin __dict__ por instancia
 class NetworkNode:
     node_id: str
     ip_address: str
@@ -156,8 +220,14 @@ class NetworkNode:
     ip_as_32bit: int
     registration_time: float
     is_active: bool = True
+    # Id codificado una sola vez para construir mensajes firmados (orjson omite los campos que empiezan con _)
+    _id_bytes: bytes = field(default=b'', init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.node_id = sys.intern(self.node_id)
+        self._id_bytes = self.node_id.encode()
 
-@dataclass 
+@dataclass(slots=True)
 class ProtocolState:
     nodes: Dict[str, NetworkNode]
     frozen_tokens: Dict[str, int]
@@ -167,13 +237,15 @@ class ProtocolState:
     votes: Dict[str, str]  # node_id -> encrypted_result
     verified_results: Dict[str, int]  # node_id -> decrypted_result
     last_agreed_leader: Optional[str]
-    fraud_reports: Dict[str, List[str]]
+    fraud_reports: Dict[str, Dict[str, str]]  # fraudulent_id -> {reporter_id: evidence}
 
 class ConsensusProtocolEngine:
     """Implementa el protocolo de consenso exacto de la especificación académica."""
     
-    def __init__(self):
-        self.crypto = CryptographicProvider()
+    def __init__(self, crypto: Optional[CryptographicProvider] = None):
+        # El proveedor criptográfico es intercambiable (p. ej. un backend con verificación por lotes)
+        self.crypto = crypto if crypto is not None else CryptographicProvider()
+        self._lock = threading.RLock()
         self.state = ProtocolState(
             nodes={},
             frozen_tokens={},
@@ -185,48 +257,118 @@ class ConsensusProtocolEngine:
             last_agreed_leader=None,
             fraud_reports={}
         )
+        self._cumulative_weights: Optional[List[int]] = None  # Caché para selección ponderada
+        self._total_frozen = 0  # Suma de frozen_tokens mantenida en cada congelamiento
+        self._rotation_index: List[Tuple[int, str]] = []  # (-ip_as_32bit, node_id) de nodos activos, ordenado
+        # Versión del estado que afecta el conteo de votos; invalida el resultado de consenso en caché
+        self._state_version = 0
+        self._current_leader: Optional[str] = None  # leader_rotation_order[current_round % n], recalculado al cambiar
+        self._consensus_cache: Optional[Tuple[int, Tuple[bool, Optional[str], float]]] = None
+        # Persistencia diferida: las mutaciones encolan eventos y un hilo los agrega al registro en lote
+        self._state_dirty = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._wal_buffer: List[bytes] = []  # Eventos serializados pendientes de escribir
+        self._wal_buffered = 0  # Bytes en _wal_buffer
+        self._wal_full = threading.Event()  # Despierta al hilo de persistencia antes del intervalo
+        self._wal_seq = 0  # Número del último evento; la instantánea guarda hasta cuál incluye
+        self._wal_bytes = 0  # Tamaño actual de WAL_FILE
+        self._compact_pending = False  # Una escritura falló: la próxima debe ser una instantánea completa
         self.load_persistent_state()
+        # Con el método "spawn" (macOS, Windows) los procesos de minado reimportan este módulo y crean su
+        # propio motor; solo el proceso principal escribe el estado, o los hijos lo pisarían al terminar.
+        # (parent_process() aún es None mientras el hijo importa; el nombre ya fue asignado)
+        if multiprocessing.current_process().name == "MainProcess":
+            threading.Thread(target=self._persistence_loop, daemon=True).start()
+            atexit.register(self.flush_persistent_state, compact=True)
     
+    @_synchronized
     def register_network_member(self, node_id: str, ip: str, public_key: str, signature: str) -> bool:
         """Registrar nuevo miembro de la red con ordenamiento basado en IP."""
-        # Verificar firma
-        registration_data = f"{node_id}{ip}{public_key}".encode()
-        if not self.crypto.verify_signature(public_key, registration_data, signature):
-            return False
+        return self.register_network_members_bulk([(node_id, ip, public_key, signature)])[0]
+    
+    @_synchronized
+    def register_network_members_bulk(self, members: List[Tuple[str, str, str, str]]) -> List[bool]:
+        """Registrar varios miembros (node_id, ip, public_key, signature) verificando firmas en un solo lote."""
+        results = [False] * len(members)
         
-        # Convertir IP a número de 32-bit para ordenamiento
-        ip_as_32bit = self._ip_to_32bit(ip)
+        # Verificar firmas
+        checks = [
+            (public_key, _signed_message(node_id.encode(), ip.encode(), public_key.encode()), signature)
+            for node_id, ip, public_key, signature in members
+        ]
+        valid = self._verify_signatures(checks)
         
-        node = NetworkNode(
-            node_id=node_id,
-            ip_address=ip,
-            public_key=public_key,
-            ip_as_32bit=ip_as_32bit,
-            registration_time=time.time()
-        )
+        for i, (node_id, ip, public_key, signature) in enumerate(members):
+            if not valid[i]:
+                continue
+            
+            # Convertir IP a número de 32-bit para ordenamiento
+            try:
+                ip_as_32bit = self._ip_to_32bit(ip)
+            except (OSError, ValueError):
+                continue  # Dirección IPv4 malformada (inet_pton da ValueError si contiene un NUL)
+            
+            node = NetworkNode(
+                node_id=node_id,
+                ip_address=ip,
+                public_key=public_key,
+                ip_as_32bit=ip_as_32bit,
+                registration_time=time.time()
+            )
+            
+            previous = self.state.nodes.get(node_id)
+            if previous is not None and previous.is_active:
+                self._remove_from_rotation(previous)
+            
+            self.state.nodes[node.node_id] = node  # Clave internada junto con el nodo
+            self._add_to_rotation(node)
+            self._append_wal({"op": "register", "node": node})
+            results[i] = True
         
-        self.state.nodes[node_id] = node
-        self._update_leader_rotation_order()
-        self._save_persistent_state()
-        return True
+        if any(results):
+            self._update_leader_rotation_order()
+        return results
     
+    @_synchronized
     def freeze_tokens_for_participation(self, node_id: str, tokens: int, signature: str) -> bool:
         """Congelar tokens para participación en consenso con verificación de firma."""
-        if node_id not in self.state.nodes:
-            return False
+        return self.freeze_tokens_bulk([(node_id, tokens, signature)])[0]
+    
+    @_synchronized
+    def freeze_tokens_bulk(self, freezes: List[Tuple[str, int, str]]) -> List[bool]:
+        """Congelar tokens de varios nodos (node_id, tokens, signature) verificando firmas en un solo lote."""
+        results = [False] * len(freezes)
+        timestamp = int(time.time())
         
         # Verificar firma para decisión de congelamiento de tokens
-        freeze_data = f"{node_id}{tokens}{int(time.time())}".encode()
-        node = self.state.nodes[node_id]
-        
-        if not self.crypto.verify_signature(node.public_key, freeze_data, signature):
-            return False
+        pending, checks = [], []
+        for i, (node_id, tokens, signature) in enumerate(freezes):
+            node = self.state.nodes.get(node_id)
+            if node is None:
+                continue
+            try:
+                freeze_data = _signed_message(node._id_bytes, _FREEZE_FIELDS.pack(tokens, timestamp))
+            except struct.error:
+                continue  # Cantidad de tokens fuera del rango de 64 bits
+            pending.append(i)
+            checks.append((node.public_key, freeze_data, signature))
         
         # Compartir información firmada digitalmente según protocolo
-        self.state.frozen_tokens[node_id] = self.state.frozen_tokens.get(node_id, 0) + tokens
-        self._save_persistent_state()
-        return True
+        for i, ok in zip(pending, self._verify_signatures(checks)):
+            if not ok:
+                continue
+            node_id, tokens, _ = freezes[i]
+            self.state.frozen_tokens[node_id] = self.state.frozen_tokens.get(node_id, 0) + tokens
+            self._total_frozen += tokens
+            self._append_wal({"op": "freeze", "node": node_id, "tokens": tokens})
+            results[i] = True
+        
+        if any(results):
+            self._cumulative_weights = None
+            self._state_version += 1
+        return results
     
+    @_synchronized
     def generate_consensus_number_as_leader(self, leader_id: str, signature: str) -> Optional[int]:
         """Líder genera número de consenso de 32-bit según especificación."""
         # Verificar que el líder existe y está registrado
@@ -241,7 +383,7 @@ class ConsensusProtocolEngine:
         
         # Generar número de consenso: primeros 2 bytes = número de ronda, últimos 2 bytes = aleatorio
         round_bytes = self.state.current_round & 0xFFFF  # Reiniciar después de 65,536
-        random_bytes = random.randint(0, 0xFFFF)  # RNG de Python, uniforme [0, 2^16-1]
+        random_bytes = secrets.randbits(16)  # CSPRNG del sistema operativo, uniforme [0, 2^16-1]
         
         consensus_number = (round_bytes << 16) | random_bytes
         
@@ -249,153 +391,228 @@ class ConsensusProtocolEngine:
         encrypted_number = self.crypto.encrypt_with_private_key(leader_id, consensus_number)
         
         self.state.consensus_number = consensus_number
-        self._save_persistent_state()
         
         return consensus_number
     
+    @_synchronized
     def process_member_vote(self, node_id: str, encrypted_result: str, signature: str) -> bool:
         """Procesar voto de miembro de la red con selección aleatoria ponderada."""
-        if node_id not in self.state.nodes or node_id not in self.state.frozen_tokens:
-            return False
+        return self.process_member_votes_bulk([(node_id, encrypted_result, signature)])[0]
+    
+    @_synchronized
+    def process_member_votes_bulk(self, votes: List[Tuple[str, str, str]]) -> List[bool]:
+        """Procesar varios votos (node_id, encrypted_result, signature) verificando firmas en un solo lote."""
+        results = [False] * len(votes)
         
         # Verificar firma para voto
-        vote_data = f"{node_id}{encrypted_result}".encode()
-        node = self.state.nodes[node_id]
+        pending, checks = [], []
+        for i, (node_id, encrypted_result, signature) in enumerate(votes):
+            node = self.state.nodes.get(node_id)
+            if node is None or node_id not in self.state.frozen_tokens:
+                continue
+            vote_data = _signed_message(node._id_bytes, encrypted_result.encode())
+            pending.append(i)
+            checks.append((node.public_key, vote_data, signature))
         
-        if not self.crypto.verify_signature(node.public_key, vote_data, signature):
-            return False
-        
-        # Almacenar voto cifrado
-        self.state.votes[node_id] = encrypted_result
-        
-        # Descifrar para obtener índice del líder seleccionado usando número de consenso como semilla
-        if self.state.consensus_number:
-            try:
-                # Usar número de consenso como semilla para selección aleatoria ponderada
-                selected_index = self._weighted_random_selection(node_id, self.state.consensus_number)
-                self.state.verified_results[node_id] = selected_index
-            except Exception as e:
-                return False
+        for i, ok in zip(pending, self._verify_signatures(checks)):
+            if not ok:
+                continue
+            node_id, encrypted_result, _ = votes[i]
+            
+            # Almacenar voto cifrado
+            self.state.votes[node_id] = encrypted_result
+            self._state_version += 1
+            
+            # Descifrar para obtener índice del líder seleccionado usando número de consenso como semilla
+            if self.state.consensus_number:
+                try:
+                    # Usar número de consenso como semilla para selección aleatoria ponderada
+                    selected_index = self._weighted_random_selection(node_id, self.state.consensus_number)
+                    self.state.verified_results[node_id] = selected_index
+                except Exception as e:
+                    continue
+            
+            results[i] = True
         
-        self._save_persistent_state()
-        return True
+        return results
     
+    @_synchronized
     def verify_consensus_agreement(self) -> Tuple[bool, Optional[str], float]:
         """Verificar si 2/3 de la red está de acuerdo en el mismo líder seleccionado."""
+        # Reutilizar el último conteo mientras no cambien votos, tokens, rotación o ronda
+        if self._consensus_cache is not None and self._consensus_cache[0] == self._state_version:
+            return self._consensus_cache[1]
+        
+        result = self._tally_consensus()
+        self._consensus_cache = (self._state_version, result)
+        return result
+    
+    def _tally_consensus(self) -> Tuple[bool, Optional[str], float]:
+        """Contar votos ponderados por tokens y aplicar el umbral bizantino de 2/3."""
         if not self.state.verified_results:
             return False, None, 0.0
         
         # Contar votos para cada líder (ponderado por tokens)
-        leader_votes = {}
-        total_weight = 0
+        frozen_tokens = self.state.frozen_tokens
+        leader_by_index = self.state.leader_rotation_order
+        rotation_size = len(leader_by_index)
+        leader_votes = Counter()
         
         for node_id, selected_index in self.state.verified_results.items():
-            if node_id in self.state.frozen_tokens:
-                weight = self.state.frozen_tokens[node_id]
-                selected_leader = self.state.leader_rotation_order[selected_index % len(self.state.leader_rotation_order)]
-                
-                leader_votes[selected_leader] = leader_votes.get(selected_leader, 0) + weight
-                total_weight += weight
+            weight = frozen_tokens.get(node_id)
+            if weight is not None:
+                leader_votes[leader_by_index[selected_index % rotation_size]] += weight
         
+        total_weight = sum(leader_votes.values())
         if not leader_votes or total_weight == 0:
             return False, None, 0.0
         
         # Encontrar líder con más votos
-        winning_leader = max(leader_votes, key=leader_votes.get)
-        winning_votes = leader_votes[winning_leader]
+        winning_leader, winning_votes = leader_votes.most_common(1)[0]
         
-        agreement_percentage = (winning_votes / total_weight) * 100
+        agreement_percentage = (winning_votes / total_weight) * 100  # Solo para mostrar
         
-        # Tolerancia a fallas bizantinas: requerir 2/3 (66.67%) de acuerdo
-        has_consensus = agreement_percentage >= 66.67
+        # Tolerancia a fallas bizantinas: requerir 2/3 de acuerdo (aritmética entera, exacta en el límite)
+        has_consensus = winning_votes * 3 >= total_weight * 2
         
         if has_consensus:
             self.state.last_agreed_leader = winning_leader
         
         return has_consensus, winning_leader, agreement_percentage
     
+    @_synchronized
     def report_fraudulent_behavior(self, reporter_id: str, fraudulent_id: str, evidence: str, signature: str) -> bool:
         """Reportar comportamiento fraudulento del líder."""
         if reporter_id not in self.state.nodes:
             return False
         
         # Verificar firma
-        report_data = f"{reporter_id}{fraudulent_id}{evidence}".encode()
         reporter = self.state.nodes[reporter_id]
+        report_data = _signed_message(reporter._id_bytes, fraudulent_id.encode(), evidence.encode())
         
-        if not self.crypto.verify_signature(reporter.public_key, report_data, signature):
+        if not self._verify_signature(reporter.public_key, report_data, signature):
             return False
         
         # Almacenar reporte de fraude
-        if fraudulent_id not in self.state.fraud_reports:
-            self.state.fraud_reports[fraudulent_id] = []
-        
-        self.state.fraud_reports[fraudulent_id].append(f"{reporter_id}: {evidence}")
+        # Un reporte por reportero: repetirlo solo actualiza la evidencia
+        reports = self.state.fraud_reports.setdefault(fraudulent_id, {})
+        reports[reporter_id] = evidence
         
         # Verificar si 2/3 de los nodos confirman acusación de fraude
-        total_reporters = len(self.state.fraud_reports[fraudulent_id])
+        total_reporters = len(reports)
         total_nodes = len(self.state.nodes)
+        self._append_wal({"op": "fraud", "accused": fraudulent_id, "reporter": reporter_id, "evidence": evidence})
         
-        if total_reporters >= (total_nodes * 2) // 3:
+        if total_reporters * 3 >= total_nodes * 2:
             # Expulsar líder fraudulento
-            if fraudulent_id in self.state.nodes:
-                self.state.nodes[fraudulent_id].is_active = False
+            fraudulent_node = self.state.nodes.get(fraudulent_id)
+            if fraudulent_node is not None and fraudulent_node.is_active:
+                fraudulent_node.is_active = False
+                self._remove_from_rotation(fraudulent_node)
                 self._update_leader_rotation_order()
+                self._append_wal({"op": "expel", "node": fraudulent_id})
         
-        self._save_persistent_state()
         return True
     
+    @_synchronized
     def advance_to_next_round(self):
         """Avanzar a la siguiente ronda, limpiando votos y seleccionando nuevo líder."""
         self.state.current_round += 1
         self.state.votes.clear()
         self.state.verified_results.clear()
         self.state.consensus_number = None
-        self._save_persistent_state()
+        self._state_version += 1
+        self._refresh_current_leader()
+        self._append_wal({"op": "round", "round": self.state.current_round})
+    
+    def _verify_signature(self, public_key: str, data: bytes, signature: str) -> bool:
+        """Verificar una firma con el proveedor criptográfico."""
+        return self.crypto.verify_signature(public_key, data, signature)
+    
+    def _verify_signatures(self, items: List[Tuple[str, bytes, str]]) -> List[bool]:
+        """Verificar firmas (clave, mensaje, firma) juntas con verify_signatures_bulk."""
+        return self.crypto.verify_signatures_bulk(items)
     
     def _ip_to_32bit(self, ip: str) -> int:
         """Convertir dirección IP a número de 32-bit para ordenamiento determinístico."""
-        parts = ip.split('.')
-        return (int(parts[0]) << 24) + (int(parts[1]) << 16) + (int(parts[2]) << 8) + int(parts[3])
+        # inet_pton solo acepta la forma canónica a.b.c.d (inet_aton también admite "10.1" o "0x0a.1")
+        return struct.unpack('!I', socket.inet_pton(socket.AF_INET, ip))[0]
     
     def _update_leader_rotation_order(self):
         """Actualizar rotación de líder basada en ordenamiento de dirección IP (mayor primero)."""
-        active_nodes = [node for node in self.state.nodes.values() if node.is_active]
-        # Ordenar por IP como número de 32-bit, descendente (IP mayor primero)
-        sorted_nodes = sorted(active_nodes, key=lambda x: x.ip_as_32bit, reverse=True)
-        self.state.leader_rotation_order = [node.node_id for node in sorted_nodes]
+        # El índice ya está ordenado por IP como número de 32-bit, descendente
+        self.state.leader_rotation_order = [node_id for _, node_id in self._rotation_index]
+        self._state_version += 1
+        self._refresh_current_leader()
+    
+    def _refresh_current_leader(self):
+        """Recalcular el líder esperado; solo cambia con la ronda o el orden de rotación."""
+        order = self.state.leader_rotation_order
+        self._current_leader = order[self.state.current_round % len(order)] if order else None
+    
+    def _add_to_rotation(self, node: NetworkNode):
+        """Insertar nodo activo en el índice de rotación en O(log n) comparaciones."""
+        bisect.insort(self._rotation_index, (-node.ip_as_32bit, node.node_id))
+    
+    def _remove_from_rotation(self, node: NetworkNode):
+        """Quitar nodo del índice de rotación localizándolo por búsqueda binaria."""
+        entry = (-node.ip_as_32bit, node.node_id)
+        i = bisect.bisect_left(self._rotation_index, entry)
+        if i < len(self._rotation_index) and self._rotation_index[i] == entry:
+            del self._rotation_index[i]
     
     def _is_current_leader(self, node_id: str) -> bool:
         """Verificar si el nodo es el líder actual basado en rotación."""
-        if not self.state.leader_rotation_order:
-            return False
-        
-        current_leader_index = self.state.current_round % len(self.state.leader_rotation_order)
-        current_leader = self.state.leader_rotation_order[current_leader_index]
-        return current_leader == node_id
+        return self._current_leader is not None and self._current_leader == node_id
     
     def _weighted_random_selection(self, node_id: str, seed: int) -> int:
         """Selección aleatoria ponderada proporcional a tokens congelados usando semilla de consenso."""
-        # Usar número de consenso como semilla
-        random.seed(seed)
+        # Usar número de consenso como semilla de un generador local (sin alterar el RNG global)
+        rng = random.Random(seed)
         
         # Obtener tokens totales
-        total_tokens = sum(self.state.frozen_tokens.values())
+        cumulative_weights = self._cumulative_token_weights()
+        total_tokens = cumulative_weights[-1] if cumulative_weights else 0
         if total_tokens == 0:
             return 0
         
-        # Generar número aleatorio en rango [0, total_tokens]
-        rand_value = random.randint(0, total_tokens - 1)
+        # Generar número aleatorio en rango [0, total_tokens)
+        rand_value = rng.randrange(total_tokens)
+        
+        # Seleccionar basado en pesos de tokens (búsqueda binaria sobre pesos acumulados)
+        i = bisect.bisect_right(cumulative_weights, rand_value)
+        return i % len(self.state.leader_rotation_order)
+    
+    @_synchronized
+    def select_k_leaders(self, k: int, seed: Optional[int] = None) -> List[str]:
+        """Seleccionar k líderes candidatos distintos (principal + respaldos) ponderados por tokens.
         
-        # Seleccionar basado en pesos de tokens
-        cumulative_weight = 0
-        for i, (member_id, tokens) in enumerate(self.state.frozen_tokens.items()):
-            cumulative_weight += tokens
-            if rand_value < cumulative_weight:
-                return i % len(self.state.leader_rotation_order)
+        Muestreo de Efraimidis–Spirakis: cada nodo activo recibe la clave log(u) / w y se toman
+        las k mayores. Usa el número de consenso como semilla si no se indica otra; sin ninguno de
+        los dos devuelve una lista vacía, porque una semilla del sistema no sería reproducible.
+        """
+        if seed is None:
+            seed = self.state.consensus_number
+            if seed is None:
+                return []
+        rng = random.Random(seed)
         
-        return 0
+        nodes = self.state.nodes
+        keys = [
+            # 1 - random() está en (0, 1], así log() nunca recibe 0
+            (math.log(1.0 - rng.random()) / weight, node_id)
+            for node_id, weight in self.state.frozen_tokens.items()
+            if weight > 0 and node_id in nodes and nodes[node_id].is_active
+        ]
+        return [node_id for _, node_id in heapq.nlargest(k, keys)]
+    
+    def _cumulative_token_weights(self) -> List[int]:
+        """Pesos acumulados de tokens congelados, recalculados solo cuando cambian."""
+        if self._cumulative_weights is None:
+            self._cumulative_weights = list(itertools.accumulate(self.state.frozen_tokens.values()))
+        return self._cumulative_weights
     
+    @_synchronized
     def get_current_state(self) -> Dict[str, Any]:
         """Obtener estado actual del protocolo para API."""
         has_consensus, winning_leader, agreement_pct = self.verify_consensus_agreement()
@@ -403,57 +620,213 @@ class ConsensusProtocolEngine:
         return {
             "current_round": self.state.current_round,
             "registered_nodes": len(self.state.nodes),
-            "active_nodes": len([n for n in self.state.nodes.values() if n.is_active]),
-            "frozen_tokens_total": sum(self.state.frozen_tokens.values()),
+            "active_nodes": len(self.state.leader_rotation_order),  # La rotación contiene solo nodos activos
+            "frozen_tokens_total": self._total_frozen,
             "votes_received": len(self.state.votes),
             "has_consensus": has_consensus,
             "winning_leader": winning_leader,
             "agreement_percentage": round(agreement_pct, 2),
-            "current_leader": self.state.leader_rotation_order[self.state.current_round % len(self.state.leader_rotation_order)] if self.state.leader_rotation_order else None
+            "current_leader": self._current_leader
         }
     
-    def _save_persistent_state(self):
-        """Guardar estado en almacenamiento persistente."""
+    def _append_wal(self, event: Dict[str, Any]):
+        """Encolar un evento de cambio; el hilo de persistencia lo agrega a WAL_FILE."""
+        self._wal_seq += 1
+        event["seq"] = self._wal_seq
+        line = orjson.dumps(event) + b"\n"
+        self._wal_buffer.append(line)
+        self._wal_buffered += len(line)
+        if self._wal_buffered >= WAL_FLUSH_BYTES:
+            self._wal_full.set()
+        self._state_dirty.set()
+    
+    def _persistence_loop(self):
+        """Escribir el estado en segundo plano, agrupando las mutaciones de cada intervalo."""
+        while True:
+            self._state_dirty.wait()
+            self._wal_full.wait(STATE_FLUSH_INTERVAL)
+            self._wal_full.clear()
+            self.flush_persistent_state()
+    
+    def flush_persistent_state(self, compact: bool = False):
+        """Agregar los eventos pendientes al registro, o compactarlo en una instantánea si creció demasiado.
+        
+        Con compact=True (al terminar el proceso) siempre se escribe la instantánea si hay cambios.
+        """
+        with self._flush_lock:
+            try:
+                with self._lock:
+                    if not self._state_dirty.is_set() and not (compact and self._wal_bytes):
+                        return
+                    self._state_dirty.clear()
+                    lines = b"".join(self._wal_buffer)
+                    self._wal_buffer.clear()
+                    self._wal_buffered = 0
+                    compact = (compact or self._compact_pending
+                               or self._wal_bytes + len(lines) > WAL_COMPACT_BYTES)
+                    if compact:
+                        state_data = {
+                            "nodes": self.state.nodes,  # orjson serializa los dataclass sin copiarlos con asdict
+                            "frozen_tokens": self.state.frozen_tokens,
+                            "current_round": self.state.current_round,
+                            "leader_rotation_order": self.state.leader_rotation_order,
+                            "fraud_reports": self.state.fraud_reports,
+                            "wal_seq": self._wal_seq,
+                            "timestamp": time.time()
+                        }
+                        # Serializar bajo el lock; la escritura a disco ocurre fuera de él
+                        payload = orjson.dumps(state_data)
+                
+                if compact:
+                    tmp_path = STATE_FILE + '.tmp'
+                    with open(tmp_path, 'wb') as f:
+                        f.write(payload)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, STATE_FILE)
+                    # Si el proceso termina antes de vaciar el registro, wal_seq evita reaplicar sus eventos
+                    open(WAL_FILE, 'wb').close()
+                    self._wal_bytes = 0
+                else:
+                    with open(WAL_FILE, 'ab') as f:
+                        f.write(lines)
+                        f.flush()
+                        os.fsync(f.fileno())  # En el hilo de persistencia, fuera de las peticiones
+                    self._wal_bytes += len(lines)
+                self._compact_pending = False
+            except Exception as e:
+                print(f"Warning: Could not save state: {e}")
+                # Los eventos ya salieron del búfer: agregar los siguientes dejaría un hueco en el registro.
+                # La instantánea incluye todo el estado en memoria, así que el próximo intento la reescribe
+                with self._lock:
+                    self._compact_pending = True
+                    self._state_dirty.set()
+    
+    @staticmethod
+    def _migrate_fraud_reports(reports) -> Dict[str, str]:
+        """Convertir reportes guardados como lista de "reporter: evidencia" al formato por reportero."""
+        if isinstance(reports, dict):
+            return reports
+        migrated = {}
+        for entry in reports:
+            reporter_id, _, evidence = entry.partition(': ')
+            migrated[reporter_id] = evidence
+        return migrated
+    
+    def _replay_wal(self, snapshot_seq: int):
+        """Aplicar sobre el estado cargado los eventos del registro posteriores a la instantánea."""
         try:
-            state_data = {
-                "nodes": {k: asdict(v) for k, v in self.state.nodes.items()},
-                "frozen_tokens": self.state.frozen_tokens,
-                "current_round": self.state.current_round,
-                "leader_rotation_order": self.state.leader_rotation_order,
-                "fraud_reports": self.state.fraud_reports,
-                "timestamp": time.time()
-            }
-            
-            with open('consensus_protocol_state.json', 'w') as f:
-                json.dump(state_data, f, indent=2)
-        except Exception as e:
-            print(f"Warning: Could not save state: {e}")
+            with open(WAL_FILE, 'r+b') as f:
+                raw = f.read()
+                valid_end = 0
+                for line in raw.splitlines(keepends=True):
+                    if not line.endswith(b"\n"):
+                        break  # Escritura interrumpida al final del registro
+                    event = orjson.loads(line)
+                    valid_end += len(line)
+                    if event["seq"] > snapshot_seq:
+                        self._apply_wal_event(event)
+                        self._wal_seq = event["seq"]
+                if valid_end < len(raw):
+                    f.truncate(valid_end)
+                self._wal_bytes = valid_end
+        except FileNotFoundError:
+            pass
+    
+    def _apply_wal_event(self, event: Dict[str, Any]):
+        """Reaplicar un evento del registro sobre el estado persistente."""
+        op = event["op"]
+        if op == "register":
+            node = NetworkNode(**event["node"])
+            self.state.nodes[node.node_id] = node
+        elif op == "freeze":
+            node_id = event["node"]
+            self.state.frozen_tokens[node_id] = self.state.frozen_tokens.get(node_id, 0) + event["tokens"]
+        elif op == "fraud":
+            self.state.fraud_reports.setdefault(event["accused"], {})[event["reporter"]] = event["evidence"]
+        elif op == "expel":
+            node = self.state.nodes.get(event["node"])
+            if node is not None:
+                node.is_active = False
+        elif op == "round":
+            self.state.current_round = event["round"]
     
     def load_persistent_state(self):
-        """Cargar estado desde almacenamiento persistente."""
+        """Cargar la instantánea desde almacenamiento persistente y reaplicar el registro de cambios."""
         try:
-            with open('consensus_protocol_state.json', 'r') as f:
-                data = json.load(f)
+            try:
+                with open(STATE_FILE, 'rb') as f:
+                    data = orjson.loads(f.read())
+            except FileNotFoundError:
+                data = {}  # Comenzar con estado fresco
             
             # Restaurar nodos
             for node_id, node_data in data.get('nodes', {}).items():
-                self.state.nodes[node_id] = NetworkNode(**node_data)
+                if 'ip_as_32bit' not in node_data:
+                    try:
+                        node_data['ip_as_32bit'] = self._ip_to_32bit(node_data['ip_address'])
+                    except (OSError, ValueError):
+                        continue  # IP guardada malformada: se omite el nodo sin descartar el resto del estado
+                node = NetworkNode(**node_data)
+                self.state.nodes[node.node_id] = node
             
             # Restaurar otro estado
             self.state.frozen_tokens = data.get('frozen_tokens', {})
             self.state.current_round = data.get('current_round', 0)
-            self.state.leader_rotation_order = data.get('leader_rotation_order', [])
-            self.state.fraud_reports = data.get('fraud_reports', {})
+            self.state.fraud_reports = {
+                fraudulent_id: self._migrate_fraud_reports(reports)
+                for fraudulent_id, reports in data.get('fraud_reports', {}).items()
+            }
+            self._wal_seq = data.get('wal_seq', 0)
+            self._replay_wal(self._wal_seq)
+            
+            # Reconstruir estructuras derivadas
+            self._total_frozen = sum(self.state.frozen_tokens.values())
+            self._cumulative_weights = None
+            self._rotation_index = sorted(
+                (-node.ip_as_32bit, node.node_id) for node in self.state.nodes.values() if node.is_active
+            )
+            self._update_leader_rotation_order()
+            self._state_version += 1
             
-        except FileNotFoundError:
-            pass  # Comenzar con estado fresco
         except Exception as e:
             print(f"Warning: Could not load state: {e}")
 
 
 # INTEGRACIÓN BLOCKCHAIN
 
-@dataclass
+_mining_stop = None  # Evento compartido por los procesos de minado
+
+def _init_mining_worker(stop_event):
+    global _mining_stop
+    _mining_stop = stop_event
+
+def _mine_nonce_stride(prefix: bytes, target: bytes, start: int, stride: int) -> Optional[Tuple[int, bytes]]:
+    """Probar nonces start, start + stride, ... hasta hallar uno válido o que otro proceso lo halle."""
+    copy_state = hashlib.sha256(prefix).copy
+    nonce = start
+    while not _mining_stop.is_set():
+        for _ in range(MINING_CHECK_INTERVAL):
+            h = copy_state()
+            h.update(b"%d" % nonce)
+            digest = h.digest()
+            if digest < target:
+                _mining_stop.set()
+                return nonce, digest
+            nonce += stride
+    return None
+
+def _mine_parallel(prefix: bytes, target: bytes, first_nonce: int, workers: int) -> Tuple[int, bytes]:
+    """Repartir el espacio de nonces entre procesos intercalados; gana el menor nonce encontrado."""
+    stop_event = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_mining_worker,
+                             initargs=(stop_event,)) as pool:
+        futures = [pool.submit(_mine_nonce_stride, prefix, target, first_nonce + i, workers)
+                   for i in range(workers)]
+        results = [future.result() for future in futures]
+    return min(result for result in results if result is not None)
+
+@dataclass(slots=True)
 class BlockchainTransaction:
     sender: str
     recipient: str
@@ -462,6 +835,9 @@ class BlockchainTransaction:
     signature: str
 
 class BlockchainBlock:
+    __slots__ = ('index', 'timestamp', 'transactions', 'previous_hash', 'consensus_data',
+                 'nonce', 'hash', '_prefix', '_prefix_state', '_verified')
+    
     def __init__(self, index: int, transactions: List[BlockchainTransaction], 
                  previous_hash: str, consensus_data: Dict[str, Any]):
         self.index = index
@@ -471,37 +847,95 @@ class BlockchainBlock:
         self.consensus_data = consensus_data  # Consensus validation info
         self.nonce = 0
         self.hash = ""
+        # El contenido del bloque no cambia tras crearlo: la entrada del hash sin nonce se serializa una vez
+        self._prefix = self._hash_prefix()
+        self._prefix_state = hashlib.sha256(self._prefix)  # Estado SHA-256 tras el prefijo (midstate)
+        self._verified = False  # True si self.hash lo calculó este proceso al minar
+    
+    def _hash_prefix(self) -> bytes:
+        """Datos del bloque que preceden al nonce en la entrada del hash."""
+        tx_data = b''.join(self._transaction_bytes(tx) for tx in self.transactions)
+        consensus_bytes = orjson.dumps(self.consensus_data, option=orjson.OPT_SORT_KEYS)  # JSON canónico compacto
+        return b''.join((f"{self.index}{self.timestamp}".encode(), tx_data, self.previous_hash.encode(), consensus_bytes))
+    
+    @staticmethod
+    def _transaction_bytes(tx: BlockchainTransaction) -> bytes:
+        """Codificar transacción: emisor y receptor con prefijo de longitud, monto y tiempo como double."""
+        sender, recipient = tx.sender.encode(), tx.recipient.encode()
+        return b''.join((
+            _FIELD_LENGTH.pack(len(sender)), sender,
+            _FIELD_LENGTH.pack(len(recipient)), recipient,
+            _TX_FIELDS.pack(tx.amount, tx.timestamp),
+        ))
     
     def calculate_hash(self) -> str:
         """Calcular hash del bloque incluyendo datos de consenso."""
-        tx_data = ''.join([f"{tx.sender}{tx.recipient}{tx.amount}{tx.timestamp}" for tx in self.transactions])
-        consensus_str = json.dumps(self.consensus_data, sort_keys=True)
-        block_data = f"{self.index}{self.timestamp}{tx_data}{self.previous_hash}{consensus_str}{self.nonce}"
-        return hashlib.sha256(block_data.encode()).hexdigest()
+        h = self._prefix_state.copy()
+        h.update(b"%d" % self.nonce)
+        return h.hexdigest()
     
     def mine_block(self, difficulty: int = 4):
         """Minar bloque con prueba de trabajo."""
-        target = "0" * difficulty
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
+        if self.hash.startswith("0" * difficulty):
+            return
+        # `difficulty` ceros hexadecimales iniciales equivalen a digest < 16^(64 - difficulty);
+        # se compara el digest crudo y solo se convierte a hex el ganador
+        target = (1 << (256 - 4 * difficulty)).to_bytes(32, 'big')
+        prefix = self._prefix
+        
+        workers = os.cpu_count() or 1
+        if difficulty >= PARALLEL_MINING_DIFFICULTY and workers > 1:
+            self.nonce, digest = _mine_parallel(prefix, target, self.nonce + 1, workers)
+            self.hash = digest.hex()
+            self._verified = True
+            return
+        
+        # El prefijo no cambia entre intentos: se parte del estado de SHA-256 ya calculado.
+        # SHA-256 es incremental, así que los dígitos altos del nonce se absorben una vez por
+        # cada bloque de 1000 y cada intento solo añade sus tres últimos dígitos ya codificados
+        high, low = divmod(self.nonce + 1, _NONCE_BLOCK)
+        while True:
+            if high:
+                block_state = self._prefix_state.copy()
+                block_state.update(b"%d" % high)
+                suffixes = _NONCE_SUFFIXES
+            else:
+                block_state = self._prefix_state
+                suffixes = _SHORT_NONCE_SUFFIXES
+            copy_state = block_state.copy
+            for low in range(low, _NONCE_BLOCK):
+                h = copy_state()
+                h.update(suffixes[low])
+                digest = h.digest()
+                if digest < target:
+                    self.nonce = high * _NONCE_BLOCK + low
+                    self.hash = digest.hex()
+                    self._verified = True
+                    return
+            high += 1
+            low = 0
 
 class ConsensusValidatedBlockchain:
     """Blockchain que valida bloques a través del protocolo de consenso."""
     
     def __init__(self, consensus_engine: ConsensusProtocolEngine):
+        self._lock = threading.RLock()
         self.chain: List[BlockchainBlock] = []
         self.pending_transactions: List[BlockchainTransaction] = []
         self.consensus_engine = consensus_engine
         self.mining_difficulty = 4
+        self._validated_blocks = 0  # Bloques con consensus_validated, contados al agregarlos
         
         # Crear bloque génesis
         genesis = BlockchainBlock(0, [], "0", {"type": "genesis", "consensus_required": False})
         genesis.mine_block(self.mining_difficulty)
         self.chain.append(genesis)
     
+    @_synchronized
     def create_transaction(self, sender: str, recipient: str, amount: float, signature: str) -> bool:
-        """Crear nueva transacción."""
+        """Crear nueva transacción; se rechaza si la cola de pendientes está llena."""
+        if len(self.pending_transactions) >= MAX_PENDING_TRANSACTIONS:
+            return False
         transaction = BlockchainTransaction(
             sender=sender,
             recipient=recipient,
@@ -512,6 +946,7 @@ class ConsensusValidatedBlockchain:
         self.pending_transactions.append(transaction)
         return True
     
+    @_synchronized
     def mine_block_with_consensus_validation(self, miner_address: str) -> Optional[BlockchainBlock]:
         """Minar nuevo bloque solo si el consenso valida al líder de minado."""
         if not self.pending_transactions:
@@ -521,8 +956,9 @@ class ConsensusValidatedBlockchain:
         consensus_state = self.consensus_engine.get_current_state()
         
         # Verificar que el minero es líder aprobado por consenso
-        if consensus_state["has_consensus"] and consensus_state["winning_leader"]:
-            approved_leader = consensus_state["winning_leader"]
+        approved_leader = consensus_state["winning_leader"]
+        if consensus_state["has_consensus"] and approved_leader:
+            chain = self.chain
             
             # Crear bloque validado por consenso
             consensus_data = {
@@ -533,24 +969,34 @@ class ConsensusValidatedBlockchain:
                 "round": consensus_state["current_round"]
             }
             
+            # El bloque toma la lista de pendientes sin copiarla; se devuelve si la validación falla
+            transactions = self.pending_transactions
+            self.pending_transactions = []
             new_block = BlockchainBlock(
-                len(self.chain),
-                self.pending_transactions[:],  # Copiar transacciones
-                self.chain[-1].hash,
+                len(chain),
+                transactions,
+                chain[-1].hash,
                 consensus_data
             )
             
-            new_block.mine_block(self.mining_difficulty)
+            try:
+                new_block.mine_block(self.mining_difficulty)
+                # Validar a través de consenso antes de agregar
+                is_valid = self._validate_block_through_consensus(new_block)
+            except BaseException:
+                self.pending_transactions = transactions
+                raise
             
-            # Validar a través de consenso antes de agregar
-            if self._validate_block_through_consensus(new_block):
-                self.chain.append(new_block)
-                self.pending_transactions.clear()
+            if is_valid:
+                chain.append(new_block)
+                self._validated_blocks += 1
                 
                 # Avanzar consenso a la siguiente ronda
                 self.consensus_engine.advance_to_next_round()
                 
                 return new_block
+            
+            self.pending_transactions = transactions  # Nadie agrega pendientes mientras se tiene el lock
         
         return None
     
@@ -560,23 +1006,49 @@ class ConsensusValidatedBlockchain:
         if not block.consensus_data.get("consensus_validated", False):
             return False
         
+        # Un bloque minado aquí ya tiene su hash calculado sobre estos datos; solo se rehashean los recibidos
+        if block._verified:
+            return block.hash.startswith("0" * self.mining_difficulty)
+        
         # Verificar integridad del hash
         calculated_hash = block.calculate_hash()
         return calculated_hash == block.hash
     
+    @_synchronized
+    def verify_chain(self) -> bool:
+        """Revalidar la cadena completa: índices, enlaces, prueba de trabajo y hash de cada bloque."""
+        zeros = "0" * self.mining_difficulty
+        previous_hash = "0"
+        for index, block in enumerate(self.chain):
+            if block.index != index or block.previous_hash != previous_hash or not block.hash.startswith(zeros):
+                return False
+            if index and not block.consensus_data.get("consensus_validated", False):
+                return False
+            # Se reserializa el bloque en vez de usar el prefijo guardado: así se detectan datos alterados
+            h = hashlib.sha256(block._hash_prefix())
+            h.update(b"%d" % block.nonce)
+            if h.hexdigest() != block.hash:
+                return False
+            previous_hash = block.hash
+        return True
+    
+    @_synchronized
     def get_blockchain_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas del blockchain."""
+        chain = self.chain
         return {
-            "total_blocks": len(self.chain),
+            "total_blocks": len(chain),
             "pending_transactions": len(self.pending_transactions),
             "mining_difficulty": self.mining_difficulty,
-            "last_block_hash": self.chain[-1].hash if self.chain else None,
-            "consensus_validated_blocks": len([b for b in self.chain if b.consensus_data.get("consensus_validated", False)])
+            "last_block_hash": chain[-1].hash if chain else None,
+            "consensus_validated_blocks": self._validated_blocks
         }
 
 
 # API REST (FastAPI)
 
+# Los endpoints declaran su tipo de retorno: FastAPI serializa la respuesta directo a bytes JSON con
+# pydantic-core (Pydantic v2), sin pasar por jsonable_encoder y json.dumps
 app = FastAPI(
     title="Implementación de Protocolo de Consenso",
     description="Implementación exacta del protocolo de consenso blockchain distribuido",
@@ -587,11 +1059,18 @@ app = FastAPI(
 consensus_engine = ConsensusProtocolEngine()
 blockchain = ConsensusValidatedBlockchain(consensus_engine)
 
+# Firmas, hashing y minado son trabajo de CPU: se ejecutan fuera del event loop
+_api_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+async def _run_blocking(func, *args):
+    """Ejecutar una llamada bloqueante en el pool de la API sin detener el event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_api_pool, func, *args)
+
 @app.get("/status")
-async def get_system_status():
+async def get_system_status() -> Dict[str, Any]:
     """Obtener estado actual del sistema."""
-    consensus_state = consensus_engine.get_current_state()
-    blockchain_stats = blockchain.get_blockchain_stats()
+    consensus_state = await _run_blocking(consensus_engine.get_current_state)
+    blockchain_stats = await _run_blocking(blockchain.get_blockchain_stats)
     
     return {
         "system": "Academic Consensus Protocol",
@@ -602,9 +1081,10 @@ async def get_system_status():
     }
 
 @app.post("/network/register")
-async def register_node(request: NodeRegisterReq):
+async def register_node(request: NodeRegisterReq) -> Dict[str, Any]:
     """Registrar nuevo nodo de red."""
-    success = consensus_engine.register_network_member(
+    success = await _run_blocking(
+        consensus_engine.register_network_member,
         request.nodeId,
         request.ip, 
         request.publicKey,
@@ -614,12 +1094,13 @@ async def register_node(request: NodeRegisterReq):
     if success:
         return {"success": True, "message": f"Node {request.nodeId} registered successfully"}
     else:
-        raise HTTPException(status_code=400, detail="Registration failed - invalid signature")
+        raise HTTPException(status_code=400, detail="Registration failed - invalid signature or IP address")
 
 @app.post("/tokens/freeze")
-async def freeze_tokens(request: TokenFreezeReq):
+async def freeze_tokens(request: TokenFreezeReq) -> Dict[str, Any]:
     """Congelar tokens para participación en consenso."""
-    success = consensus_engine.freeze_tokens_for_participation(
+    success = await _run_blocking(
+        consensus_engine.freeze_tokens_for_participation,
         request.nodeId,
         request.tokens,
         request.signature
@@ -631,9 +1112,10 @@ async def freeze_tokens(request: TokenFreezeReq):
         raise HTTPException(status_code=400, detail="Token freezing failed - invalid node or signature")
 
 @app.post("/consensus/generate-number")
-async def generate_consensus_number(request: ConsensusNumberReq):
+async def generate_consensus_number(request: ConsensusNumberReq) -> Dict[str, Any]:
     """Líder genera número de consenso."""
-    consensus_number = consensus_engine.generate_consensus_number_as_leader(
+    consensus_number = await _run_blocking(
+        consensus_engine.generate_consensus_number_as_leader,
         request.leaderId,
         request.signature
     )
@@ -648,9 +1130,10 @@ async def generate_consensus_number(request: ConsensusNumberReq):
         raise HTTPException(status_code=403, detail="Not authorized leader for current round")
 
 @app.post("/consensus/vote")
-async def submit_vote(request: VoteReq):
+async def submit_vote(request: VoteReq) -> Dict[str, Any]:
     """Enviar resultado de voto cifrado."""
-    success = consensus_engine.process_member_vote(
+    success = await _run_blocking(
+        consensus_engine.process_member_vote,
         request.nodeId,
         request.encryptedResult,
         request.signature
@@ -662,9 +1145,9 @@ async def submit_vote(request: VoteReq):
         raise HTTPException(status_code=400, detail="Vote processing failed")
 
 @app.get("/consensus/result")
-async def get_consensus_result():
+async def get_consensus_result() -> Dict[str, Any]:
     """Obtener resultado actual de consenso."""
-    has_consensus, winning_leader, agreement_pct = consensus_engine.verify_consensus_agreement()
+    has_consensus, winning_leader, agreement_pct = await _run_blocking(consensus_engine.verify_consensus_agreement)
     
     return {
         "has_agreement": has_consensus,
@@ -675,12 +1158,13 @@ async def get_consensus_result():
     }
 
 @app.post("/block/validate")
-async def validate_block(request: BlockValidationReq):
+async def validate_block(request: BlockValidationReq) -> Dict[str, Any]:
     """Validar bloque a través de consenso."""
     # Crear transacción y minar bloque
-    blockchain.create_transaction("system", request.leaderId, 10.0, request.signature)
+    if not await _run_blocking(blockchain.create_transaction, "system", request.leaderId, 10.0, request.signature):
+        return {"success": False, "message": "Pending transaction queue is full"}
     
-    new_block = blockchain.mine_block_with_consensus_validation(request.leaderId)
+    new_block = await _run_blocking(blockchain.mine_block_with_consensus_validation, request.leaderId)
     
     if new_block:
         return {
@@ -692,10 +1176,17 @@ async def validate_block(request: BlockValidationReq):
     else:
         return {"success": False, "message": "Block validation failed - no consensus"}
 
+@app.get("/chain/verify")
+async def verify_chain() -> Dict[str, Any]:
+    """Revalidar todos los bloques de la cadena."""
+    valid = await _run_blocking(blockchain.verify_chain)
+    return {"valid": valid, "total_blocks": len(blockchain.chain)}
+
 @app.post("/network/report-fraud")
-async def report_fraud(request: FraudReportReq):
+async def report_fraud(request: FraudReportReq) -> Dict[str, Any]:
     """Reportar comportamiento fraudulento de nodo."""
-    success = consensus_engine.report_fraudulent_behavior(
+    success = await _run_blocking(
+        consensus_engine.report_fraudulent_behavior,
         request.reporterNodeId,
         request.fraudulentNodeId,
         request.evidence,
@@ -713,70 +1204,91 @@ async def report_fraud(request: FraudReportReq):
 class AcademicDemonstration:
     """Demostración automatizada del protocolo de consenso completo."""
     
-    def __init__(self):
+    def __init__(self, verbose: bool = True):
+        self.verbose = verbose  # False: la demostración se ejecuta sin escribir en stdout
         self.demo_nodes = [
             {"id": "node_alice", "ip": "192.168.1.100", "pubkey": "alice_pubkey"},
             {"id": "node_bob", "ip": "192.168.1.200", "pubkey": "bob_pubkey"},
             {"id": "node_charlie", "ip": "192.168.1.150", "pubkey": "charlie_pubkey"},
             {"id": "node_dave", "ip": "192.168.1.50", "pubkey": "dave_pubkey"},
         ]
+        self._events: List[str] = []  # Líneas de la fase en curso, escritas juntas al terminarla
+    
+    def _emit(self, line: str):
+        if self.verbose:
+            self._events.append(line)
+    
+    def _flush_events(self):
+        """Escribir las líneas de la fase con una sola operación sobre stdout."""
+        if self._events:
+            self._events.append("")
+            sys.stdout.write("\n".join(self._events))
+            sys.stdout.flush()
+            self._events.clear()
     
     def run_complete_demonstration(self):
         """Ejecutar demostración completa del protocolo."""
-        print("🎓 CONSENSUS PROTOCOL DEMONSTRATION")
-        print("=" * 60)
-        print("📋 Testing exact specification compliance...")
+        self._emit("🎓 CONSENSUS PROTOCOL DEMONSTRATION")
+        self._emit("=" * 60)
+        self._emit("📋 Testing exact specification compliance...")
+        self._flush_events()
         
         # Fase 1: Registro de Red
-        print("\n1️⃣ PHASE 1: Network Member Registration")
+        self._emit("\n1️⃣ PHASE 1: Network Member Registration")
         self._demo_node_registration()
+        self._flush_events()
         
         # Fase 2: Congelamiento de Tokens
-        print("\n2️⃣ PHASE 2: Token Freezing with Digital Signatures")  
+        self._emit("\n2️⃣ PHASE 2: Token Freezing with Digital Signatures")  
         self._demo_token_freezing()
+        self._flush_events()
         
         # Fase 3: Selección de Líder y Número de Consenso
-        print("\n3️⃣ PHASE 3: Leader Selection & Consensus Number Generation")
+        self._emit("\n3️⃣ PHASE 3: Leader Selection & Consensus Number Generation")
         self._demo_consensus_number_generation()
+        self._flush_events()
         
         # Fase 4: Selección Aleatoria Ponderada y Votación
-        print("\n4️⃣ PHASE 4: Weighted Random Selection & Voting")
+        self._emit("\n4️⃣ PHASE 4: Weighted Random Selection & Voting")
         self._demo_weighted_voting()
+        self._flush_events()
         
         # Fase 5: Verificación de Consenso Bizantino
-        print("\n5️⃣ PHASE 5: Byzantine Fault Tolerant Consensus")
+        self._emit("\n5️⃣ PHASE 5: Byzantine Fault Tolerant Consensus")
         self._demo_byzantine_consensus()
+        self._flush_events()
         
         # Fase 6: Validación de Bloques
-        print("\n6️⃣ PHASE 6: Consensus-Validated Block Creation")
+        self._emit("\n6️⃣ PHASE 6: Consensus-Validated Block Creation")
         self._demo_block_validation()
+        self._flush_events()
         
         # Resultados Finales
-        print("\n🏆 DEMONSTRATION COMPLETE")
+        self._emit("\n🏆 DEMONSTRATION COMPLETE")
         self._show_final_results()
+        self._flush_events()
     
     def _demo_node_registration(self):
         """Demostrar registro de nodos con ordenamiento basado en IP."""
-        for node in self.demo_nodes:
-            success = consensus_engine.register_network_member(
-                node["id"], node["ip"], node["pubkey"], f"sig_{node['id']}"
-            )
-            print(f"   {'✅' if success else '❌'} {node['id']} ({node['ip']})")
+        results = consensus_engine.register_network_members_bulk([
+            (node["id"], node["ip"], node["pubkey"], f"sig_{node['id']}") for node in self.demo_nodes
+        ])
+        for node, success in zip(self.demo_nodes, results):
+            self._emit(f"   {'✅' if success else '❌'} {node['id']} ({node['ip']})")
         
         # Mostrar orden de rotación de líder (IP mayor primero)
         state = consensus_engine.get_current_state()
-        print(f"   📋 Leader rotation order: {consensus_engine.state.leader_rotation_order}")
+        self._emit(f"   📋 Leader rotation order: {consensus_engine.state.leader_rotation_order}")
     
     def _demo_token_freezing(self):
         """Demostrar congelamiento de tokens con firmas."""
         token_amounts = [100, 150, 75, 200]  # Diferentes pesos para demostración
         
-        for i, node in enumerate(self.demo_nodes):
-            tokens = token_amounts[i]
-            success = consensus_engine.freeze_tokens_for_participation(
-                node["id"], tokens, f"freeze_sig_{node['id']}"
-            )
-            print(f"   {'✅' if success else '❌'} {node['id']}: {tokens} tokens frozen")
+        results = consensus_engine.freeze_tokens_bulk([
+            (node["id"], tokens, f"freeze_sig_{node['id']}") for node, tokens in zip(self.demo_nodes, token_amounts)
+        ])
+        for node, tokens, success in zip(self.demo_nodes, token_amounts, results):
+            self._emit(f"   {'✅' if success else '❌'} {node['id']}: {tokens} tokens frozen")
     
     def _demo_consensus_number_generation(self):
         """Demostrar generación de número de consenso."""
@@ -787,31 +1299,31 @@ class AcademicDemonstration:
                 current_leader, f"leader_sig_{current_leader}"
             )
             if consensus_num is not None:
-                print(f"   ✅ Leader {current_leader} generated consensus number: {consensus_num}")
-                print(f"   📊 Round bytes: {(consensus_num >> 16) & 0xFFFF}, Random bytes: {consensus_num & 0xFFFF}")
+                self._emit(f"   ✅ Leader {current_leader} generated consensus number: {consensus_num}")
+                self._emit(f"   📊 Round bytes: {(consensus_num >> 16) & 0xFFFF}, Random bytes: {consensus_num & 0xFFFF}")
             else:
-                print(f"   ❌ Failed to generate consensus number for leader {current_leader}")
+                self._emit(f"   ❌ Failed to generate consensus number for leader {current_leader}")
         else:
-            print("   ❌ No leader available")
+            self._emit("   ❌ No leader available")
     
     def _demo_weighted_voting(self):
         """Demostrar votación aleatoria ponderada."""
-        for i, node in enumerate(self.demo_nodes):
-            # Simular resultado de voto cifrado
-            encrypted_result = f"encrypted_vote_{i}_{node['id']}"
-            success = consensus_engine.process_member_vote(
-                node["id"], encrypted_result, f"vote_sig_{node['id']}"
-            )
-            print(f"   {'✅' if success else '❌'} {node['id']}: Vote submitted")
+        # Simular resultado de voto cifrado
+        results = consensus_engine.process_member_votes_bulk([
+            (node["id"], f"encrypted_vote_{i}_{node['id']}", f"vote_sig_{node['id']}")
+            for i, node in enumerate(self.demo_nodes)
+        ])
+        for node, success in zip(self.demo_nodes, results):
+            self._emit(f"   {'✅' if success else '❌'} {node['id']}: Vote submitted")
     
     def _demo_byzantine_consensus(self):
         """Demostrar verificación de consenso tolerante a fallas bizantinas."""
         has_consensus, winning_leader, agreement_pct = consensus_engine.verify_consensus_agreement()
         
-        print(f"   📊 Consensus reached: {'✅ Yes' if has_consensus else '❌ No'}")
-        print(f"   🏆 Winning leader: {winning_leader}")
-        print(f"   📈 Agreement: {agreement_pct:.2f}% (threshold: 66.67%)")
-        print(f"   🛡️ Byzantine fault tolerant: {'✅' if agreement_pct >= 66.67 else '❌'}")
+        self._emit(f"   📊 Consensus reached: {'✅ Yes' if has_consensus else '❌ No'}")
+        self._emit(f"   🏆 Winning leader: {winning_leader}")
+        self._emit(f"   📈 Agreement: {agreement_pct:.2f}% (threshold: 66.67%)")
+        self._emit(f"   🛡️ Byzantine fault tolerant: {'✅' if has_consensus else '❌'}")
     
     def _demo_block_validation(self):
         """Demostrar creación de bloque validado por consenso."""
@@ -823,38 +1335,38 @@ class AcademicDemonstration:
         if winning_leader:
             block = blockchain.mine_block_with_consensus_validation(winning_leader)
             if block:
-                print(f"   ✅ Block {block.index} created and validated")
-                print(f"   📦 Hash: {block.hash[:16]}...")
-                print(f"   ✅ Consensus validated: {block.consensus_data['consensus_validated']}")
+                self._emit(f"   ✅ Block {block.index} created and validated")
+                self._emit(f"   📦 Hash: {block.hash[:16]}...")
+                self._emit(f"   ✅ Consensus validated: {block.consensus_data['consensus_validated']}")
             else:
-                print("   ❌ Block validation failed")
+                self._emit("   ❌ Block validation failed")
         else:
-            print("   ⚠️ No consensus leader for block validation")
+            self._emit("   ⚠️ No consensus leader for block validation")
     
     def _show_final_results(self):
         """Mostrar resultados finales de la demostración."""
         consensus_state = consensus_engine.get_current_state()
         blockchain_stats = blockchain.get_blockchain_stats()
         
-        print("=" * 60)
-        print("📊 FINAL RESULTS")
-        print("=" * 60)
-        print(f"🌐 Network nodes: {consensus_state['registered_nodes']}")
-        print(f"🪙 Total frozen tokens: {consensus_state['frozen_tokens_total']}")
-        print(f"🗳️ Votes processed: {consensus_state['votes_received']}")
-        print(f"✅ Consensus achieved: {consensus_state['has_consensus']}")
-        print(f"⛓️ Blockchain blocks: {blockchain_stats['total_blocks']}")
-        print(f"🔒 Consensus-validated blocks: {blockchain_stats['consensus_validated_blocks']}")
+        self._emit("=" * 60)
+        self._emit("📊 FINAL RESULTS")
+        self._emit("=" * 60)
+        self._emit(f"🌐 Network nodes: {consensus_state['registered_nodes']}")
+        self._emit(f"🪙 Total frozen tokens: {consensus_state['frozen_tokens_total']}")
+        self._emit(f"🗳️ Votes processed: {consensus_state['votes_received']}")
+        self._emit(f"✅ Consensus achieved: {consensus_state['has_consensus']}")
+        self._emit(f"⛓️ Blockchain blocks: {blockchain_stats['total_blocks']}")
+        self._emit(f"🔒 Consensus-validated blocks: {blockchain_stats['consensus_validated_blocks']}")
         
-        print("\n🎯 PROTOCOL COMPLIANCE VERIFICATION:")
-        print("✅ IP-based leader rotation: IMPLEMENTED")
-        print("✅ Token-proportional participation: IMPLEMENTED") 
-        print("✅ 32-bit consensus number: IMPLEMENTED")
-        print("✅ Weighted random selection: IMPLEMENTED")
-        print("✅ 2/3 Byzantine consensus: IMPLEMENTED")
-        print("✅ Digital signature verification: IMPLEMENTED")
-        print("✅ Block validation & distribution: IMPLEMENTED")
-        print("✅ Fraud detection & expulsion: IMPLEMENTED")
+        self._emit("\n🎯 PROTOCOL COMPLIANCE VERIFICATION:")
+        self._emit("✅ IP-based leader rotation: IMPLEMENTED")
+        self._emit("✅ Token-proportional participation: IMPLEMENTED") 
+        self._emit("✅ 32-bit consensus number: IMPLEMENTED")
+        self._emit("✅ Weighted random selection: IMPLEMENTED")
+        self._emit("✅ 2/3 Byzantine consensus: IMPLEMENTED")
+        self._emit("✅ Digital signature verification: IMPLEMENTED")
+        self._emit("✅ Block validation & distribution: IMPLEMENTED")
+        self._emit("✅ Fraud detection & expulsion: IMPLEMENTED")
 
 
 
@@ -863,7 +1375,10 @@ class AcademicDemonstration:
 def start_api_server():
     """Iniciar servidor API en hilo separado."""
     def run_server():
-        uvicorn.run(app, host="0.0.0.0", port=8000, log_level="warning")
+        # uvloop/httptools se usan si están instalados (uvicorn[standard]); un solo worker
+        # porque el estado de consenso vive en memoria de este proceso
+        uvicorn.run(app, host="0.0.0.0", port=8000, log_level="warning",
+                    loop="auto", http="auto", workers=1)
     
     server_thread = threading.Thread(target=run_server, daemon=True)
     server_thread.start()
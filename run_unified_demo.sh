@@ -16,19 +16,24 @@ elif command -v python &> /dev/null; then
     PYTHON_CMD="python"
 else
     echo "❌ Error: Se requiere Python 3 pero no se encontró"
-    echo "Por favor instale Python 3.8+ e intente de nuevo"
+    echo "Por favor instale Python 3.10+ e intente de nuevo"
+    exit 1
+fi
+
+if ! $PYTHON_CMD -c "import sys; sys.exit(sys.version_info < (3, 10))"; then
+    echo "❌ Error: Se requiere Python 3.10+ (dataclasses con slots)"
     exit 1
 fi
 
 # Verificar si los paquetes requeridos están instalados
 echo "🔍 Verificando dependencias..."
-$PYTHON_CMD -c "import fastapi, uvicorn, pydantic" 2>/dev/null
+$PYTHON_CMD -c "import fastapi, uvicorn, pydantic, orjson, uvloop, httptools; assert int(pydantic.VERSION.split('.')[0]) >= 2" 2>/dev/null
 if [ $? -ne 0 ]; then
     echo "📦 Instalando dependencias requeridas..."
-    $PYTHON_CMD -m pip install fastapi uvicorn pydantic requests
+    $PYTHON_CMD -m pip install fastapi "uvicorn[standard]" "pydantic>=2" orjson requests
     if [ $? -ne 0 ]; then
         echo "❌ Falló la instalación de dependencias"
-        echo "Por favor ejecute manualmente: pip install fastapi uvicorn pydantic requests"
+        echo "Por favor ejecute manualmente: pip install fastapi \"uvicorn[standard]\" \"pydantic>=2\" orjson requests"
         exit 1
     fi
 fi